@@ -0,0 +1,293 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from wbt import calculate_wet_bulb_temperature_vectorized
+
+STAGING_DIR = '_staging'
+SPLIT_MARKER = '_SPLIT_DONE'
+ARCHIVE_KINDS = ('temp', 'humid')
+
+
+def shard_path(output_dir, station, year):
+    return os.path.join(output_dir, f'station={station}', f'year={year}', 'wbt.csv')
+
+
+def staged_dir(staging_dir, kind, station, year):
+    return os.path.join(staging_dir, kind, f'station={station}', f'year={year}')
+
+
+def archive_signature(temp_path, humid_path):
+    # Size and mtime of each archive, so appending to an archive invalidates the split
+    signature = {}
+    for path in (temp_path, humid_path):
+        stat = os.stat(path)
+        signature[os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def read_slice(path, start, end):
+    # Return the header and every line that starts inside [start, end).
+    # The archives have no quoted newlines, so line boundaries are row boundaries.
+    with open(path, 'rb') as f:
+        header = f.readline()
+        if start == 0:
+            start = f.tell()
+        else:
+            # A line that began before this slice belongs to the previous one
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        pos = f.tell()
+        if pos >= end:
+            return header, b''
+        data = f.read(end - pos)
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+    return header, data
+
+
+def split_slice(path, kind, staging_dir, index, start, end):
+    # Split one byte range of an archive into per station/year part files.
+    # Values are kept as raw text so the shard workers see exactly what the archive contains.
+    header, data = read_slice(path, start, end)
+    if not data:
+        return kind, 0, 0
+    df = pd.read_csv(io.BytesIO(header + data), dtype=str, keep_default_na=False)
+
+    # The archives store 'valid' as "YYYY-MM-DD HH:MM"; rows without a year or with a
+    # station code that is not a plain identifier cannot be placed in a partition
+    valid_rows = df['valid'].str.match(r'\d{4}') & df['station'].str.fullmatch(r'[A-Za-z0-9_-]+')
+    invalid = int((~valid_rows).sum())
+    df = df[valid_rows]
+
+    for (station, year), group in df.groupby([df['station'], df['valid'].str[:4]]):
+        part_dir = staged_dir(staging_dir, kind, station, year)
+        os.makedirs(part_dir, exist_ok=True)
+        group.to_csv(os.path.join(part_dir, f'part-{index:06d}.csv'), index=False)
+    return kind, len(df), invalid
+
+
+def split_archives(executor, temp_path, humid_path, staging_dir, slice_size, force=False):
+    marker_path = os.path.join(staging_dir, SPLIT_MARKER)
+    signature = archive_signature(temp_path, humid_path)
+
+    # Reuse a finished split if the archives have not changed since it was made
+    if not force and os.path.exists(marker_path):
+        with open(marker_path) as f:
+            marker = json.load(f)
+        if marker['signature'] == signature:
+            return signature, marker['invalid']
+
+    # A missing or stale marker means the split is incomplete or out of date, so start over
+    start = time.perf_counter()
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    futures = []
+    for kind, path in zip(ARCHIVE_KINDS, (temp_path, humid_path)):
+        size = os.path.getsize(path)
+        for index, offset in enumerate(range(0, size, slice_size)):
+            futures.append(executor.submit(split_slice, path, kind, staging_dir, index, offset, offset + slice_size))
+
+    rows = 0
+    invalid = 0
+    for future in as_completed(futures):
+        kind, slice_rows, slice_invalid = future.result()
+        rows += slice_rows
+        invalid += slice_invalid
+
+    with open(marker_path, 'w') as f:
+        json.dump({'signature': signature, 'invalid': invalid}, f)
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else float('inf')
+    print(f"Split {len(futures)} slices ({rows} rows, {invalid} invalid) into {staging_dir} "
+          f"in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return signature, invalid
+
+
+def list_staged_shards(staging_dir, kind):
+    shards = set()
+    kind_dir = os.path.join(staging_dir, kind)
+    if not os.path.isdir(kind_dir):
+        return shards
+    for station_dir in os.listdir(kind_dir):
+        station = station_dir.split('=', 1)[1]
+        for year_dir in os.listdir(os.path.join(kind_dir, station_dir)):
+            shards.add((station, year_dir.split('=', 1)[1]))
+    return shards
+
+
+def read_parts(part_dir, digest):
+    # Read the raw bytes of every part of a staged shard in slice order, feeding them into the digest
+    parts = []
+    for name in sorted(os.listdir(part_dir)):
+        with open(os.path.join(part_dir, name), 'rb') as f:
+            data = f.read()
+        digest.update(data)
+        parts.append(data)
+    return parts
+
+
+def parse_parts(parts):
+    # Load the parts, converting "M" to NaN as the app does
+    frames = [pd.read_csv(io.BytesIO(data), na_values='M', dtype={'station': str, 'valid': str}) for data in parts]
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_atomic(path, write):
+    # Write to a temporary file first so an interrupted run never leaves a partial file behind
+    tmp_path = path + '.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_manifest(manifest_path, digest, signature):
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump({'digest': digest, 'signature': signature}, f)
+    write_atomic(manifest_path, write)
+
+
+def process_shard(temp_dir, humid_dir, output_path, signature, overwrite):
+    start = time.perf_counter()
+    manifest_path = output_path + '.done'
+
+    digest = hashlib.sha1()
+    temp_parts = read_parts(temp_dir, digest)
+    humid_parts = read_parts(humid_dir, digest)
+    digest = digest.hexdigest()
+
+    # The archives were re-split, but this shard's input is unchanged, so its output is still valid
+    if not overwrite and os.path.exists(manifest_path) and os.path.exists(output_path):
+        with open(manifest_path) as f:
+            if json.load(f)['digest'] == digest:
+                write_manifest(manifest_path, digest, signature)
+                return 'resumed', 0, time.perf_counter() - start
+
+    temp_df = parse_parts(temp_parts)
+    humid_df = parse_parts(humid_parts)
+
+    # Drop incomplete rows as the app does
+    temp_df.dropna(inplace=True)
+    humid_df.dropna(inplace=True)
+
+    # Rename 'relh' to 'humidity' to match the calculation function
+    humid_df.rename(columns={'relh': 'humidity'}, inplace=True)
+
+    combined_df = pd.merge(temp_df, humid_df, on=['station', 'valid'])
+    combined_df['WBT_C'] = calculate_wet_bulb_temperature_vectorized(combined_df['tmpc'], combined_df['humidity'])
+
+    # The manifest is written last, so a shard without a matching manifest is always recomputed
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    write_atomic(output_path, lambda path: combined_df.to_csv(path, index=False))
+    write_manifest(manifest_path, digest, signature)
+
+    elapsed = time.perf_counter() - start
+    return 'processed', len(combined_df), elapsed
+
+
+def is_resumable(output_path, signature):
+    # Cheap check for shards finished against the current archives, without reading their input
+    manifest_path = output_path + '.done'
+    if not (os.path.exists(output_path) and os.path.exists(manifest_path)):
+        return False
+    with open(manifest_path) as f:
+        return json.load(f)['signature'] == signature
+
+
+def backfill(temp_path, humid_path, output_dir, workers=None, stations=None, overwrite=False,
+             slice_size=32 * 1024 * 1024, clean_staging=False):
+    start = time.perf_counter()
+    staging_dir = os.path.join(output_dir, STAGING_DIR)
+    summary = {'processed': 0, 'resumed': 0, 'missing': 0, 'failed': 0, 'rows': 0, 'invalid': 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        signature, summary['invalid'] = split_archives(
+            executor, temp_path, humid_path, staging_dir, slice_size, force=overwrite)
+
+        temp_shards = list_staged_shards(staging_dir, 'temp')
+        humid_shards = list_staged_shards(staging_dir, 'humid')
+
+        # Workers only receive directory paths; each one reads its own shard from the staging area
+        futures = {}
+        for station, year in sorted(temp_shards | humid_shards):
+            if stations and station not in stations:
+                continue
+            if (station, year) not in temp_shards or (station, year) not in humid_shards:
+                print(f"{station} {year}: skipped, missing temperature or humidity data")
+                summary['missing'] += 1
+                continue
+            output_path = shard_path(output_dir, station, year)
+            # Shards finished against the current archives are skipped, which makes the backfill resumable
+            if not overwrite and is_resumable(output_path, signature):
+                summary['resumed'] += 1
+                continue
+            future = executor.submit(
+                process_shard,
+                staged_dir(staging_dir, 'temp', station, year),
+                staged_dir(staging_dir, 'humid', station, year),
+                output_path, signature, overwrite,
+            )
+            futures[future] = (station, year)
+
+        for future in as_completed(futures):
+            station, year = futures[future]
+            try:
+                status, rows, elapsed = future.result()
+            except Exception as e:
+                print(f"{station} {year}: failed: {e!r}", file=sys.stderr)
+                summary['failed'] += 1
+                continue
+            summary[status] += 1
+            if status == 'resumed':
+                continue
+            summary['rows'] += rows
+            rate = rows / elapsed if elapsed > 0 else float('inf')
+            print(f"{station} {year}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+
+    if clean_staging and not summary['failed']:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {summary['processed']} shards ({summary['rows']} rows) in {elapsed:.2f}s, "
+          f"resumed {summary['resumed']}, missing data {summary['missing']}, failed {summary['failed']}, "
+          f"invalid rows {summary['invalid']}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Recompute Wet Bulb Temperature over station archives.',
+        epilog='Each output shard keeps every column of both archives merged on station and valid, '
+               'plus WBT_C, the same schema as combined_with_wbt.csv written by the app. '
+               'The archives are first split into OUTPUT_DIR/_staging, a full copy of both archives '
+               'that is kept for resuming unless --clean-staging is given. Rows whose valid does not '
+               'start with a four-digit year, or whose station is not a plain code, are dropped and '
+               'counted as invalid.',
+    )
+    parser.add_argument('--temp', default='temp.csv', help='temperature archive (station, valid, tmpc)')
+    parser.add_argument('--humid', default='humid.csv', help='humidity archive (station, valid, relh)')
+    parser.add_argument('--output-dir', default='wbt_backfill', help='directory for station/year partitioned output')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of worker processes')
+    parser.add_argument('--stations', nargs='*', help='only backfill these station codes')
+    parser.add_argument('--overwrite', action='store_true', help='re-split the archives and recompute shards that already exist')
+    parser.add_argument('--slice-size', type=int, default=32 * 1024 * 1024, help='bytes of archive each worker splits at a time')
+    parser.add_argument('--clean-staging', action='store_true', help='delete the staging copy once every shard has finished')
+    args = parser.parse_args()
+
+    summary = backfill(args.temp, args.humid, args.output_dir, workers=args.workers, stations=args.stations,
+                       overwrite=args.overwrite, slice_size=args.slice_size, clean_staging=args.clean_staging)
+    if summary['failed']:
+        sys.exit(1)
+
+
+# Run the backfill
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from backfill import backfill, shard_path
+from wbt import calculate_wet_bulb_temperature_vectorized
+
+STATIONS = ['VABB', 'VOMM']
+YEARS = [2022, 2023]
+
+
+def write_archives(tmp_path):
+    temp_rows, humid_rows = [], []
+    for i, station in enumerate(STATIONS):
+        for year in YEARS:
+            for hour in range(3):
+                valid = f'{year}-05-01 {hour:02d}:00'
+                temp_rows.append({'station': station, 'valid': valid, 'tmpc': 25 + i + hour})
+                humid_rows.append({'station': station, 'valid': valid, 'relh': 60 + 5 * hour})
+    # A missing reading is dropped, as in the app
+    temp_rows.append({'station': 'VABB', 'valid': '2022-05-01 03:00', 'tmpc': 'M'})
+    humid_rows.append({'station': 'VABB', 'valid': '2022-05-01 03:00', 'relh': 70})
+
+    temp_path = tmp_path / 'temp.csv'
+    humid_path = tmp_path / 'humid.csv'
+    pd.DataFrame(temp_rows).to_csv(temp_path, index=False)
+    pd.DataFrame(humid_rows).to_csv(humid_path, index=False)
+    return str(temp_path), str(humid_path)
+
+
+def test_backfill_writes_partitions(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    output_dir = str(tmp_path / 'out')
+
+    summary = backfill(temp_path, humid_path, output_dir, workers=2, slice_size=64)
+
+    assert summary == {'processed': 4, 'resumed': 0, 'missing': 0, 'failed': 0, 'rows': 12, 'invalid': 0}
+    for station in STATIONS:
+        for year in YEARS:
+            path = shard_path(output_dir, station, year)
+            assert path == os.path.join(output_dir, f'station={station}', f'year={year}', 'wbt.csv')
+            df = pd.read_csv(path)
+            assert len(df) == 3
+            assert (df['station'] == station).all()
+            assert df['valid'].str.startswith(str(year)).all()
+            np.testing.assert_allclose(
+                df['WBT_C'], calculate_wet_bulb_temperature_vectorized(df['tmpc'], df['humidity']))
+
+
+def test_backfill_resumes_existing_shards(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    output_dir = str(tmp_path / 'out')
+
+    backfill(temp_path, humid_path, output_dir, workers=2, stations=['VABB'])
+    done_path = shard_path(output_dir, 'VABB', 2022)
+    os.remove(shard_path(output_dir, 'VABB', 2023))
+    done_mtime = os.stat(done_path).st_mtime_ns
+
+    summary = backfill(temp_path, humid_path, output_dir, workers=2)
+
+    assert summary['resumed'] == 1
+    assert summary['processed'] == 3
+    assert os.stat(done_path).st_mtime_ns == done_mtime
+    for station, year in [('VABB', 2023), ('VOMM', 2022), ('VOMM', 2023)]:
+        assert os.path.exists(shard_path(output_dir, station, year))
+
+    summary = backfill(temp_path, humid_path, output_dir, workers=2, overwrite=True)
+    assert summary['processed'] == 4
+    assert summary['resumed'] == 0
+
+
+def test_backfill_recomputes_shards_after_archive_append(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    output_dir = str(tmp_path / 'out')
+    backfill(temp_path, humid_path, output_dir, workers=2, slice_size=64)
+
+    with open(temp_path, 'a') as f:
+        f.write('VOMM,2023-05-01 05:00,30\n')
+    with open(humid_path, 'a') as f:
+        f.write('VOMM,2023-05-01 05:00,80\n')
+
+    summary = backfill(temp_path, humid_path, output_dir, workers=2, slice_size=64)
+
+    assert summary['processed'] == 1
+    assert summary['resumed'] == 3
+    df = pd.read_csv(shard_path(output_dir, 'VOMM', 2023))
+    assert len(df) == 4
+    assert df['valid'].iloc[-1] == '2023-05-01 05:00'
+
+
+def test_backfill_drops_invalid_rows(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    with open(temp_path, 'a') as f:
+        f.write('VABB,,30\n')
+        f.write('../VABB,2022-05-01 05:00,30\n')
+    output_dir = str(tmp_path / 'out')
+
+    summary = backfill(temp_path, humid_path, output_dir, workers=2, clean_staging=True)
+
+    assert summary['invalid'] == 2
+    assert summary['processed'] == 4
+    assert not os.path.exists(os.path.join(output_dir, '_staging'))
+    assert sorted(os.listdir(output_dir)) == ['station=VABB', 'station=VOMM']
+    assert sorted(os.listdir(os.path.join(output_dir, 'station=VABB'))) == ['year=2022', 'year=2023']
+
+
+def test_backfill_reports_missing_humidity(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    humid_df = pd.read_csv(humid_path)
+    humid_df[humid_df['station'] != 'VOMM'].to_csv(humid_path, index=False)
+
+    summary = backfill(temp_path, humid_path, str(tmp_path / 'out'), workers=2)
+
+    assert summary['missing'] == 2
+    assert summary['processed'] == 2
+
+
+def test_backfill_reports_failed_shard_and_continues(tmp_path):
+    temp_path, humid_path = write_archives(tmp_path)
+    humid_df = pd.read_csv(humid_path)
+    humid_df['relh'] = humid_df['relh'].astype(str)
+    humid_df.loc[humid_df['station'] == 'VOMM', 'relh'] = 'bad'
+    humid_df.to_csv(humid_path, index=False)
+
+    summary = backfill(temp_path, humid_path, str(tmp_path / 'out'), workers=2)
+
+    assert summary['failed'] == 2
+    assert summary['processed'] == 2
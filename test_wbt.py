@@ -0,0 +1,29 @@
+import math
+
+import numpy as np
+
+from wbt import calculate_wet_bulb_temperature, calculate_wet_bulb_temperature_vectorized
+
+
+def reference_wet_bulb_temperature(T, RH):
+    # Original scalar formula from the app, kept here to pin the vectorized version to it
+    term1 = T * math.atan(0.151977 * ((RH + 8.313659) ** 0.5))
+    term2 = math.atan(T + RH)
+    term3 = math.atan(RH - 1.676331)
+    term4 = 0.00391838 * (RH ** 1.5) * math.atan(0.023101 * RH)
+    return term1 + term2 - term3 + term4 - 4.686035
+
+
+def test_vectorized_matches_scalar_on_grid():
+    T, RH = np.meshgrid(np.linspace(-10, 50, 61), np.linspace(5, 100, 20))
+    result = calculate_wet_bulb_temperature_vectorized(T, RH)
+    expected = np.vectorize(calculate_wet_bulb_temperature)(T, RH)
+    reference = np.vectorize(reference_wet_bulb_temperature)(T, RH)
+    np.testing.assert_allclose(result, expected)
+    np.testing.assert_allclose(result, reference)
+
+
+def test_scalar_returns_float():
+    wbt = calculate_wet_bulb_temperature(20, 50)
+    assert isinstance(wbt, float)
+    assert math.isclose(wbt, 13.7, abs_tol=0.05)
@@ -0,0 +1,18 @@
+import numpy as np
+
+
+def calculate_wet_bulb_temperature_vectorized(temperature, humidity):
+    # Works on scalars as well as whole columns (lists, numpy arrays, pandas Series)
+    T = np.asarray(temperature, dtype=float)
+    RH = np.asarray(humidity, dtype=float)
+    term1 = T * np.arctan(0.151977 * np.sqrt(RH + 8.313659))
+    term2 = np.arctan(T + RH)
+    term3 = np.arctan(RH - 1.676331)
+    term4 = 0.00391838 * (RH ** 1.5) * np.arctan(0.023101 * RH)
+    constant_term = -4.686035
+    WBT = term1 + term2 - term3 + term4 + constant_term
+    return WBT
+
+
+def calculate_wet_bulb_temperature(temperature, humidity):
+    return float(calculate_wet_bulb_temperature_vectorized(temperature, humidity))
@@ -1,5 +1,4 @@
 import requests
-import math
 import seaborn as sns
 import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap, Normalize
@@ -13,6 +12,7 @@ from streamlit_folium import folium_static
 from PIL import Image
 import pytz  # Add this import for timezone support
 import plotly.express as px
+from wbt import calculate_wet_bulb_temperature, calculate_wet_bulb_temperature_vectorized
 
 def get_weather_data(city):
     api_key = '71aa83b817d6fff071b7d63b02843f66'
@@ -33,17 +33,6 @@ def get_weather_data(city):
             print("API response:", data)
             return None, None
 
-def calculate_wet_bulb_temperature(temperature, humidity):
-    T = temperature
-    RH = humidity
-    term1 = T * math.atan(0.151977 * ((RH + 8.313659) ** 0.5))
-    term2 = math.atan(T + RH)
-    term3 = math.atan(RH - 1.676331)
-    term4 = 0.00391838 * (RH ** 1.5) * math.atan(0.023101 * RH)
-    constant_term = -4.686035
-    WBT = term1 + term2 - term3 + term4 + constant_term
-    return WBT
-
 def get_current_time(timezone_str='Asia/Kolkata'):
     tz = pytz.timezone(timezone_str)
     current_time = datetime.now(tz)
@@ -167,7 +156,7 @@ def main():
 
 
     # Calculate the Wet Bulb Temperature for each row
-    combined_df['WBT_C'] = combined_df.apply(lambda row: calculate_wet_bulb_temperature(row['tmpc'], row['humidity']), axis=1)
+    combined_df['WBT_C'] = calculate_wet_bulb_temperature_vectorized(combined_df['tmpc'], combined_df['humidity'])
 
     # Save the combined DataFrame with WBT to a new CSV file
     combined_df.to_csv('combined_with_wbt.csv', index=False)